@@ -1,187 +1,489 @@
+import codecs
+import functools
+import hashlib
+import hmac
 import logging
 import os
-import toml
 import bcrypt
-from flask import Flask, jsonify, request, Response, make_response
+import orjson
+try:
+    import tomllib
+except ImportError:  # Python < 3.11
+    import tomli as tomllib
+from flask import Flask, request, Response, send_file
+from flask.json.provider import DefaultJSONProvider
 from flask_cors import CORS
-from vuefinder import VuefinderApp, fill_fs
-from fs.memoryfs import MemoryFS
+from vuefinder import VuefinderApp, IndexedMemoryFS, LazyFS
 from fs.wrap import WrapReadOnly
 from fs.osfs import OSFS
-from waitress import serve
+from fs.errors import CreateFailed, ResourceNotFound
+from fs.path import dirname
+import uvicorn
 from pathlib import Path
+from itertools import chain, islice
+from concurrent.futures import ThreadPoolExecutor
 from dotenv import load_dotenv
-from uvicorn.middleware.wsgi import WSGIMiddleware
+from a2wsgi import WSGIMiddleware
+from werkzeug.exceptions import RequestEntityTooLarge
 from werkzeug.wrappers import Request
+from werkzeug.wsgi import wrap_file
 from werkzeug.test import EnvironBuilder
 import sqlite3
+import threading
+import time
 import jwt
 import datetime
 
-logging.basicConfig(level=logging.INFO)
-logger = logging.getLogger("waitress")
-
 # Load environment variables
 load_dotenv()
-SECRET_KEY = os.getenv('SECRET_KEY', 'somethingfrank')
+
+# LOG_LEVEL=WARNING drops the per-request INFO lines in production
+logging.basicConfig(level=os.getenv("LOG_LEVEL", "INFO").upper())
+logger = logging.getLogger(__name__)
+
+# Kept as bytes so PyJWT does not re-encode the HMAC key on every token
+SECRET_KEY = os.getenv('SECRET_KEY', 'somethingfrank').encode()
 API_KEY = os.getenv("API_KEY")
 if not API_KEY:
     logger.error(
-        "API_KEY is not set in the environment. API requests will fail without a valid key."
+        "API_KEY is not set in the environment. All API requests will be rejected."
     )
+API_KEY_BYTES = (API_KEY or "").encode()
+# bcrypt work factor for the stored access code. When set, the hash is
+# upgraded or downgraded to it on the next successful login; pick the
+# highest cost whose check stays around 250 ms on the deployment hardware.
+BCRYPT_COST = int(os.getenv("BCRYPT_COST", 0)) or None
+# Largest request body accepted by the REST API, in bytes (unlimited if unset)
+MAX_UPLOAD_SIZE = int(os.getenv("MAX_UPLOAD_SIZE", 0)) or None
 ALLOWED_ORIGINS = os.getenv(
     "ALLOWED_ORIGINS", "http://localhost:5173").split(",")
 logger.info(type(ALLOWED_ORIGINS))
 
+# Size of the chunks used to stream file contents
+CHUNK_SIZE = 1 << 20  # 1 MiB
+# Largest file content returned inline by /api/read; longer files are truncated
+READ_MAX_SIZE = 1 << 20  # 1 MiB
+# Files up to this size are kept in the /api/read content cache
+READ_CACHE_MAX_SIZE = 64 << 10  # 64 KiB
+
+
+class OrjsonProvider(DefaultJSONProvider):
+    """JSON provider that serializes with orjson instead of the json module."""
+
+    def dumps(self, obj, **kwargs):
+        return orjson.dumps(obj, default=self.default).decode()
+
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        return self._app.response_class(
+            orjson.dumps(obj, default=self.default), mimetype=self.mimetype
+        )
+
+
 # Initialize Flask app for REST API
 api = Flask(__name__)
-CORS(api, resources={
-    r"/*": {
-        "origins": ALLOWED_ORIGINS,
-        "methods": ["GET", "POST", "PUT", "DELETE", "OPTIONS", "PATCH"],
-        "allow_headers": ["Content-Type", "Authorization", "x-api-key"],
-        "supports_credentials": True,
-        "expose_headers": ["Content-Type", "Authorization"],
-        "allow_credentials": True
-    }
-})
+api.json = OrjsonProvider(api)  # Used by request.json
+# Bodies over this size are rejected with 413 before they are read
+api.config["MAX_CONTENT_LENGTH"] = MAX_UPLOAD_SIZE
+# Preflight requests are answered by Flask-CORS (automatic_options) and pass
+# ApiKeyMiddleware untouched; max_age lets browsers reuse a preflight result
+# instead of sending one before every cross-origin write.
+CORS_OPTIONS = {
+    "origins": ALLOWED_ORIGINS,
+    "methods": ["GET", "POST", "PUT", "DELETE", "OPTIONS", "PATCH"],
+    "allow_headers": ["Content-Type", "Authorization", "x-api-key"],
+    "supports_credentials": True,
+    "expose_headers": ["Content-Type", "Authorization"],
+    "max_age": 600,
+}
+CORS(api, resources={r"/*": CORS_OPTIONS})
+
+
+def ojsonify(obj, status=200):
+    """Serialize obj with orjson straight into a JSON response."""
+    return Response(orjson.dumps(obj), status=status, mimetype="application/json")
+
+
+def error_response(message, status):
+    """Build a static JSON error response once, to be returned as-is by views."""
+    body = orjson.dumps({"error": message})
+    return body, status, {"Content-Type": "application/json"}
+
+
+# Prebuilt responses for the fixed error messages of the API
+ERR_UNAUTHORIZED = error_response("Unauthorized: Invalid API Key", 401)
+ERR_LIST_FS_FAILED = error_response("Failed to retrieve file systems", 500)
+ERR_FS_NAME_AND_PATH_REQUIRED = error_response("fs_name and path are required", 400)
+ERR_CREATE_FAILED = error_response("Failed to create file or folder", 500)
+ERR_NEGATIVE_PAGINATION = error_response("offset and limit must not be negative", 400)
+ERR_NOT_TEXT = error_response("File is not readable as text", 400)
+ERR_READ_FAILED = error_response("Failed to read path", 500)
+ERR_UPDATE_FIELDS_REQUIRED = error_response("fs_name, path, and content are required", 400)
+ERR_RENAME_FIELDS_REQUIRED = error_response("fs_name, old_path, and new_path are required", 400)
+ERR_UPDATE_FAILED = error_response("Failed to save content to file", 500)
+ERR_RENAME_FAILED = error_response("Failed to rename file or folder", 500)
+ERR_DELETE_FAILED = error_response("Failed to delete file or folder", 500)
+ERR_DOWNLOAD_FAILED = error_response("Failed to download file", 500)
+ERR_FS_NAME_REQUIRED = error_response("fs_name is required", 400)
+ERR_NO_FILE_PROVIDED = error_response("No file provided", 400)
+ERR_NO_FILE_SELECTED = error_response("No file selected", 400)
+ERR_UPLOAD_FAILED = error_response("Failed to upload file", 500)
+ERR_UPLOAD_TOO_LARGE = error_response("File is too large", 413)
+ERR_INVALID_JSON = error_response("Request body must be a JSON object", 400)
+ERR_REQUEST_TOO_LARGE = error_response("Request body is too large", 413)
+ERR_ACCESS_CODE_REQUIRED = error_response("Access code is required", 400)
+ERR_AUTHENTICATION_FAILED = error_response("Authentication failed", 401)
+ERR_INVALID_ACCESS_CODE = error_response("Invalid access code", 401)
+ERR_FS_UNAVAILABLE = error_response("File system is unavailable", 503)
 
 # Middleware to enforce API key requirement
 
 
-@api.before_request
-def require_api_key():
-    # Skip API key check for OPTIONS requests and login endpoint
-    if request.method == "OPTIONS" or request.path == "/api/login":
-        return None
+class ApiKeyMiddleware:
+    """Reject API requests without a valid x-api-key header.
+
+    Runs as WSGI middleware in front of Flask, so rejected requests are
+    answered without building a Flask request context or routing.
+    """
+
+    def __init__(self, app, api_key: bytes):
+        self.app = app
+        self.api_key = api_key
 
-    api_key = request.headers.get("x-api-key")
-    if api_key != API_KEY:
-        return jsonify({"error": "Unauthorized: Invalid API Key"}), 401
+    def __call__(self, environ, start_response):
+        # Skip API key check for OPTIONS requests and login endpoint
+        if environ["REQUEST_METHOD"] == "OPTIONS" or environ.get("PATH_INFO") == "/api/login":
+            return self.app(environ, start_response)
+
+        # WSGI header values are latin-1 decoded; encoding them back gives the
+        # raw header bytes. Constant-time comparison so the key cannot be
+        # guessed from response timing. An unset key rejects everything, rather
+        # than matching requests that omit the header.
+        api_key = environ.get("HTTP_X_API_KEY", "").encode("latin-1")
+        if self.api_key and hmac.compare_digest(api_key, self.api_key):
+            return self.app(environ, start_response)
+
+        body, _, headers = ERR_UNAUTHORIZED
+        response_headers = [*headers.items(), ("Content-Length", str(len(body)))]
+        # Let allowed browser origins read the error, as Flask-CORS would
+        origin = environ.get("HTTP_ORIGIN")
+        if origin in ALLOWED_ORIGINS:
+            response_headers += [
+                ("Access-Control-Allow-Origin", origin),
+                ("Access-Control-Allow-Credentials", "true"),
+                ("Vary", "Origin"),
+            ]
+        start_response("401 UNAUTHORIZED", response_headers)
+        return [body]
+
+
+api.wsgi_app = ApiKeyMiddleware(api.wsgi_app, API_KEY_BYTES)
+
+
+def require_fields(*fields, error):
+    """Parse a view's JSON body once and check that the given fields are set.
+
+    The decorated view receives the parsed payload as its first argument.
+    If any field is missing or empty, the prebuilt `error` response is
+    returned instead.
+    """
+    def decorator(view):
+        @functools.wraps(view)
+        def wrapper(**kwargs):
+            try:
+                payload = orjson.loads(request.get_data(cache=False))
+            except RequestEntityTooLarge:
+                return ERR_REQUEST_TOO_LARGE
+            except orjson.JSONDecodeError:
+                return ERR_INVALID_JSON
+            if not isinstance(payload, dict):
+                return ERR_INVALID_JSON
+            if not all(payload.get(field) for field in fields):
+                return error
+            return view(payload, **kwargs)
+        return wrapper
+    return decorator
 
 # Load user configuration from TOML file
 
 
 def load_config(config_path="config.toml"):
-    config_path = Path(config_path)
-    if not config_path.exists():
-        logger.error(f"Configuration file '{config_path}' not found.")
-        return []
     try:
-        return toml.load(config_path).get("file_systems", [])
-    except toml.TomlDecodeError as e:
-        logger.error(f"Error parsing configuration file: {e}")
+        mtime_ns = os.stat(config_path).st_mtime_ns
+    except FileNotFoundError:
+        logger.error("Configuration file '%s' not found.", config_path)
         return []
+    return list(parse_config(str(config_path), mtime_ns))
+
+
+@functools.lru_cache(maxsize=1)
+def parse_config(config_path, mtime_ns):
+    """Parse the file systems of a configuration file.
+
+    Keyed on the modification time, so the file is only parsed again after
+    it changes on disk.
+    """
+    try:
+        with open(config_path, "rb") as f:
+            return tuple(tomllib.load(f).get("file_systems", []))
+    except tomllib.TOMLDecodeError as e:
+        logger.error("Error parsing configuration file: %s", e)
+        return ()
+
+
+class AccessCodeStore:
+    """In-memory copy of the hashed access code stored in users.db.
+
+    The hash is read from the database at most once per `ttl` seconds
+    instead of on every login, so an access code changed by another process
+    is picked up without a restart. Call refresh() to reload it at once.
+    """
+
+    # Applied once to the long-lived connection. WAL lets readers proceed
+    # while a write is in progress, and busy_timeout waits for a lock held
+    # by another process instead of failing at once.
+    PRAGMAS = (
+        "PRAGMA journal_mode=WAL",
+        "PRAGMA synchronous=NORMAL",
+        "PRAGMA temp_store=MEMORY",
+        "PRAGMA busy_timeout=5000",
+    )
+
+    def __init__(self, db_path: str, ttl: float = 30):
+        self.db_path = db_path
+        self.ttl = ttl
+        self._lock = threading.RLock()
+        self._conn: sqlite3.Connection | None = None
+        self._hash: bytes | None = None
+        self._loaded_at = 0.0
+        self.refresh()
+
+    @property
+    def hash(self) -> bytes | None:
+        """The hashed access code, reloaded once it is older than the TTL"""
+        if time.monotonic() - self._loaded_at >= self.ttl:
+            with self._lock:
+                # Another thread may have refreshed while this one waited
+                if time.monotonic() - self._loaded_at >= self.ttl:
+                    self.refresh()
+        return self._hash
+
+    def refresh(self) -> bytes | None:
+        """Reload the hashed access code from the database"""
+        with self._lock:
+            try:
+                self._hash = self._load()
+            except Exception as e:
+                # e.g. "database is locked": keep serving the last known hash
+                # rather than locking everyone out until the next reload
+                logger.error("Error loading access code from database: %s", e)
+            self._loaded_at = time.monotonic()
+            return self._hash
+
+    def replace(self, old_hash: bytes, new_hash: bytes):
+        """Store new_hash in place of old_hash, in the database and in memory"""
+        with self._lock:
+            try:
+                # Match the old hash whether it was stored as TEXT or as a BLOB
+                cursor = self._connection().execute(
+                    'UPDATE access SET access_code = ? WHERE access_code IN (?, ?)',
+                    (new_hash.decode('ascii'), old_hash.decode('ascii'), old_hash))
+                if cursor.rowcount:
+                    self._hash = new_hash
+                else:
+                    # Changed by someone else in the meantime; use their hash
+                    self.refresh()
+            except Exception as e:
+                logger.error("Error updating access code in database: %s", e)
+
+    def _connection(self) -> sqlite3.Connection:
+        # One connection is shared by all threads; callers hold self._lock
+        if self._conn is None:
+            conn = sqlite3.connect(
+                self.db_path, check_same_thread=False, isolation_level=None)
+            for pragma in self.PRAGMAS:
+                conn.execute(pragma)
+            self._conn = conn
+        return self._conn
+
+    def _load(self) -> bytes | None:
+        """Read the hash; None if the table holds no access code. Database
+        errors are raised."""
+        row = self._connection().execute(
+            'SELECT access_code FROM access LIMIT 1').fetchone()
+        if row:
+            # Keep the hash as bytes so bcrypt can use it without re-encoding.
+            # bcrypt hashes are ASCII; the column may hold TEXT or a BLOB.
+            value = row[0]
+            return value.encode('ascii') if isinstance(value, str) else bytes(value)
+        # A removed access code is deliberate, so logins stop working
+        logger.error("No access code found in database")
+        return None
+
+
+def bcrypt_cost(hashed: bytes) -> int:
+    """Return the work factor of a bcrypt hash ($2b$<cost>$...)"""
+    return int(hashed.split(b'$')[2])
+
+
+# Seconds an access code change in users.db may take to reach this process
+ACCESS_CODE_TTL = float(os.getenv("ACCESS_CODE_TTL", 30))
+ACCESS_CODE = AccessCodeStore(
+    os.path.join(os.path.dirname(__file__), 'users.db'), ttl=ACCESS_CODE_TTL)
+
+
+@functools.lru_cache(maxsize=1024)
+def decode_session_token(token: str) -> dict:
+    """Verify a session JWT and return its claims.
+
+    Browsers send the same cookie with every request, so successful decodes
+    are cached per token. The cache does not expire entries: callers must
+    check the "exp" claim themselves. Invalid tokens raise and are not cached.
+    """
+    # Tokens without an expiry are rejected
+    return jwt.decode(token, SECRET_KEY, algorithms=["HS256"],
+                      options={"require": ["exp"]})
 
 
 class AuthMiddleware:
     def __init__(self, app):
         self.app = app
-        self.access_code_hash = self._load_access_code_hash()
-
-    def _load_access_code_hash(self) -> str:
-        """Load the hashed access code from the database"""
-        conn = sqlite3.connect(os.path.join(
-            os.path.dirname(__file__), 'users.db'))
-        try:
-            cur = conn.cursor()
-            cur.execute('SELECT access_code FROM access LIMIT 1')
-            row = cur.fetchone()
-            if row:
-                return row[0]
-            logger.error("No access code found in database")
-            return None
-        except Exception as e:
-            logger.error(f"Error loading access code from database: {e}")
-            return None
-        finally:
-            conn.close()
 
     def verify_access(self, request: Request) -> bool:
         """Verify access using session token"""
         if request.method == "OPTIONS":
             return True
 
-        # Handle preview requests (check token in query params)
-        if request.args.get("q") == "preview":
-            token = request.args.get("token")
-            if token and bcrypt.checkpw(token.encode('utf-8'), self.access_code_hash.encode('utf-8')):
-                return True
-
-        # Get session token from cookie
+        # Every request, previews included, is authenticated with the session
+        # cookie. It is a JWT, so checking it is a cheap HMAC instead of a
+        # bcrypt hash per request. The token is deliberately not accepted in
+        # the URL, where it would end up in logs, history and Referer headers.
         token = request.cookies.get('session_token')
         if not token:
             logger.debug("No session token found in request")
             return False
 
         try:
-            # Verify the JWT token
-            jwt.decode(token, SECRET_KEY, algorithms=["HS256"])
-            logger.debug("Session token validated successfully")
-            return True
+            claims = decode_session_token(token)
         except jwt.InvalidTokenError:
             logger.warning("Invalid session token")
             return False
 
+        # A cached token may have expired since it was first decoded
+        if claims["exp"] <= time.time():
+            logger.warning("Expired session token")
+            return False
+
+        logger.debug("Session token validated successfully")
+        return True
+
     def __call__(self, environ, start_response):
         request = Request(environ)
-        is_authenticated = self.verify_access(request)
 
-        # Enable/disable VuefinderApp based on authentication
-        if is_authenticated:
-            self.app.enable()
-        else:
-            self.app.disable()
+        # Enable VuefinderApp for this request only. Toggling its shared
+        # enabled flag would let concurrent requests see each other's result.
+        environ[VuefinderApp.ENABLED_ENVIRON_KEY] = self.verify_access(request)
 
         return self.app(environ, start_response)
 
 
-# Initialize VuefinderApp
-virtual = MemoryFS()
-fill_fs(
-    virtual,
-    {
-        "foo": {
-            "file.txt": "Hello World!",
-            "foo.txt": "foo bar baz",
-            "bar": {"baz": None},
-        },
-        "foobar": {"empty": None, "hello.txt": "Hello!"},
-    },
+class PathDispatcher:
+    """Send requests for the REST API's routes to `api`, all others to `app`.
+
+    The API routes are full paths (/api/...) while Vuefinder is addressed
+    through query parameters on any other path, so the two apps can share
+    one server without rewriting paths the way prefix mounting would.
+    """
+
+    def __init__(self, app, api: Flask):
+        self.app = app
+        self.api = api
+        self.api_paths = frozenset(
+            rule.rule for rule in api.url_map.iter_rules())
+
+    def __call__(self, environ, start_response):
+        if environ.get("PATH_INFO") in self.api_paths:
+            return self.api(environ, start_response)
+        return self.app(environ, start_response)
+
+
+# Files of the in-memory virtual directory as (path, content) pairs; parent
+# directories are created as needed
+VIRTUAL_FILES = (
+    ("foo/file.txt", b"Hello World!"),
+    ("foo/foo.txt", b"foo bar baz"),
+    ("foo/bar/baz", b""),
+    ("foobar/empty", b""),
+    ("foobar/hello.txt", b"Hello!"),
 )
 
+
+@functools.cache
+def get_virtual_fs() -> IndexedMemoryFS:
+    """Build the virtual directory once per process and reuse it afterwards."""
+    virtual = IndexedMemoryFS()
+    for path, content in VIRTUAL_FILES:
+        virtual.makedirs(dirname(path), recreate=True)
+        virtual.writebytes(path, content)
+    return virtual
+
+
+# Initialize VuefinderApp
 app = VuefinderApp(enable_cors=True)
 
 # Add the virtual directory manually
-app.add_fs("virtual_directory", virtual)
+app.add_fs("virtual_directory", get_virtual_fs())
 
 # Load configuration for other file systems
 config = load_config()
 
-# Dynamically add file systems based on the configuration
+# Keep only complete configuration entries
+entries = []
 for entry in config:
-    name = entry.get("name")
+    if not entry.get("name") or not entry.get("path"):
+        logger.warning("Invalid configuration entry: %s", entry)
+        continue
+    entries.append(entry)
+
+# Probe all configured paths in parallel: on network mounts every stat is a
+# round trip, so overlapping them keeps startup time flat in the mount count.
+# The OSFS itself is only opened on first use, so this is where a root that
+# is missing or not a directory gets skipped.
+with ThreadPoolExecutor(max_workers=16) as executor:
+    paths_are_dirs = list(executor.map(
+        lambda entry: os.path.isdir(entry["path"]), entries))
+
+# Dynamically add file systems based on the configuration; add_fs mutates
+# the app, so this part stays on the main thread
+for entry, path_is_dir in zip(entries, paths_are_dirs):
+    name = entry["name"]
     read_only = entry.get("read_only", False)
-    path = entry.get("path")
+    path = Path(entry["path"])
 
-    if not name or not path:
-        logger.warning(f"Invalid configuration entry: {entry}")
+    if not path_is_dir:
+        logger.warning("Path '%s' is not a directory. Skipping '%s'.", path, name)
         continue
 
-    path = Path(path)
-    if not path.exists():
-        logger.warning(f"Path '{path}' does not exist. Skipping '{name}'.")
-        continue
+    # The OSFS is only opened when a request first uses the file system; if
+    # that fails, requests get ERR_FS_UNAVAILABLE
+    fs = LazyFS(functools.partial(OSFS, str(path)))
+    if read_only:
+        app.add_fs(name, WrapReadOnly(fs))
+        logger.info("Added read-only file system: %s -> %s", name, path)
+    else:
+        app.add_fs(name, fs)
+        logger.info("Added read-write file system: %s -> %s", name, path)
 
-    try:
-        if read_only:
-            app.add_fs(name, WrapReadOnly(OSFS(str(path))))
-            logger.info(f"Added read-only file system: {name} -> {path}")
-        else:
-            app.add_fs(name, OSFS(str(path)))
-            logger.info(f"Added read-write file system: {name} -> {path}")
-    except Exception as e:
-        logger.error(f"Failed to add file system '{name}': {e}")
+# Module-level alias of the VuefinderApp adapter registry (the same dict
+# object), so endpoints resolve file systems with a single global lookup
+ADAPTERS = app._adapters
+
+# Serialize the file system list once, now that all file systems are added
+STORAGES_JSON = orjson.dumps({"file_systems": app._get_storages()})
+STORAGES_ETAG = hashlib.md5(STORAGES_JSON).hexdigest()
 
 
 # REST API endpoint to list all file systems
@@ -191,30 +493,30 @@ for entry in config:
 def list_fs():
     """List all file systems added to the VuefinderApp instance."""
     try:
-        file_systems = app._get_storages()  # Call the _get_storages method
-        return jsonify({"file_systems": file_systems}), 200
+        # File systems only change at startup, so serve the prebuilt body
+        response = Response(STORAGES_JSON, mimetype="application/json")
+        response.set_etag(STORAGES_ETAG)
+        return response.make_conditional(request)
     except Exception as e:
-        logger.error(f"Error retrieving file systems: {e}")
-        return jsonify({"error": "Failed to retrieve file systems"}), 500
+        logger.error("Error retrieving file systems: %s", e)
+        return ERR_LIST_FS_FAILED
 
 
 # REST API endpoint to create a file or folder
 @api.route("/api/create", methods=["POST"])
-def create():
+@require_fields("fs_name", "path", error=ERR_FS_NAME_AND_PATH_REQUIRED)
+def create(payload):
     """Create a new file or folder."""
     try:
-        payload = request.json
-        fs_name = payload.get("fs_name")
-        path = payload.get("path")
+        fs_name = payload["fs_name"]
+        path = payload["path"]
         is_folder = payload.get("is_folder", False)
 
         logger.info(
-            f"Create request received: fs_name={fs_name}, path={path}, is_folder={is_folder}"
+            "Create request received: fs_name=%s, path=%s, is_folder=%s",
+            fs_name, path, is_folder
         )
 
-        if not fs_name or not path:
-            return jsonify({"error": "fs_name and path are required"}), 400
-
         if is_folder:
             result = app.create_new_folder(
                 fs_name=fs_name, path=path, name=path)
@@ -222,13 +524,48 @@ def create():
             result = app.create_new_file(fs_name=fs_name, path=path, name=path)
 
         if "error" in result:
-            return jsonify(result), 500
+            return ojsonify(result, 500)
 
-        return jsonify(result), 201
+        return ojsonify(result, 201)
 
     except Exception as e:
-        logger.error(f"Error creating file or folder: {e}")
-        return jsonify({"error": "Failed to create file or folder"}), 500
+        logger.error("Error creating file or folder: %s", e)
+        return ERR_CREATE_FAILED
+
+
+@functools.lru_cache(maxsize=256)
+def read_file_cached(fs_name, path, modified, size):
+    """Read a small file, caching its content per modification time and size.
+
+    A changed file gets a new cache key, so stale entries are never returned
+    and simply age out of the LRU.
+    """
+    with ADAPTERS[fs_name].openbin(path) as f:
+        return f.read()
+
+
+# Extensions of formats that are binary by construction. A fixed list rather
+# than the host's mimetypes database, which maps e.g. TypeScript ".ts" to
+# video/mp2t and text playlists (".m3u", ".pls") to audio types
+BINARY_EXTENSIONS = frozenset({
+    # Images
+    "png", "jpg", "jpeg", "gif", "webp", "bmp", "ico", "tif", "tiff", "heic", "avif",
+    # Audio and video
+    "mp3", "wav", "flac", "ogg", "oga", "opus", "m4a", "aac",
+    "mp4", "m4v", "mkv", "webm", "avi", "mov", "wmv", "flv",
+    # Fonts
+    "woff", "woff2", "ttf", "otf",
+    # Documents and archives
+    "pdf", "zip", "gz", "tgz", "bz2", "xz", "zst", "7z", "rar", "tar",
+    # Executables and libraries
+    "exe", "dll", "so", "dylib", "class", "pyc", "wasm",
+})
+
+
+def is_binary_name(name):
+    """Tell from a file name alone whether its content is known to be binary."""
+    return os.path.splitext(name)[1][1:].lower() in BINARY_EXTENSIONS
+
 
 # REST API endpoint to read a directory or file
 
@@ -239,109 +576,171 @@ def read():
     try:
         fs_name = request.args.get("fs_name")
         path = request.args.get("path", "/")
+        offset = request.args.get("offset", 0, type=int)
+        limit = request.args.get("limit", type=int)
+        details = request.args.get("details", "").lower() in ("1", "true")
+
+        logger.info("Read request received: fs_name=%s, path=%s", fs_name, path)
 
-        logger.info(f"Read request received: fs_name={fs_name}, path={path}")
+        if offset < 0 or (limit is not None and limit < 0):
+            return ERR_NEGATIVE_PAGINATION
 
-        fs = app._adapters.get(fs_name)
+        fs = ADAPTERS.get(fs_name)
         if not fs:
-            logger.error(f"File system '{fs_name}' not found")
-            return jsonify({"error": f"File system '{fs_name}' not found"}), 404
+            logger.error("File system '%s' not found", fs_name)
+            return ojsonify({"error": f"File system '{fs_name}' not found"}, 404)
+
+        # A single getinfo() call tells files from directories and gives the size
+        try:
+            info = fs.getinfo(path, namespaces=["details"])
+        except ResourceNotFound:
+            logger.error("Path '%s' does not exist", path)
+            return ojsonify({"error": f"Path '{path}' does not exist"}, 404)
+
+        if info.is_file:
+            # Refuse well-known binary formats without opening the file
+            if is_binary_name(info.name):
+                return ERR_NOT_TEXT
 
-        # Check if path is a file or directory
-        if fs.isfile(path):
-            # Read and return file content
+            # Read and return file content, up to READ_MAX_SIZE bytes
             try:
-                content = fs.readtext(path)
-                return jsonify({
+                size = info.size
+                modified = info.get("details", "modified")
+                if size <= READ_CACHE_MAX_SIZE and modified is not None:
+                    data = read_file_cached(fs_name, path, modified, size)
+                else:
+                    with fs.openbin(path) as f:
+                        data = f.read(READ_MAX_SIZE)
+                truncated = size > READ_MAX_SIZE
+                # An incremental decoder tolerates a multi-byte character cut off by truncation
+                content = codecs.getincrementaldecoder("utf-8")().decode(
+                    data, final=not truncated)
+                return ojsonify({
                     "type": "file",
                     "path": path,
-                    "content": content
-                }), 200
+                    "content": content,
+                    "size": size,
+                    "truncated": truncated
+                }, 200)
             except UnicodeDecodeError:
                 # If the file is not text-based (binary file)
-                return jsonify({
-                    "error": "File is not readable as text"
-                }), 400
-        elif fs.isdir(path):
-            # List directory contents
-            contents = fs.listdir(path)
-            return jsonify({
-                "type": "directory",
-                "path": path,
-                "contents": contents
-            }), 200
+                return ERR_NOT_TEXT
         else:
-            logger.error(f"Path '{path}' does not exist")
-            return jsonify({"error": f"Path '{path}' does not exist"}), 404
-
+            # List one page of the directory lazily; scandir yields entries as
+            # they are read, so only the requested page is ever materialized
+            stop = offset + limit if limit is not None else None
+            scan = fs.scandir(path, namespaces=["details"]) if details else fs.scandir(path)
+            entries = islice(scan, offset, stop)
+            # Open the directory and read the first entry before responding,
+            # so that e.g. a permission error still becomes ERR_READ_FAILED
+            entries = chain(list(islice(entries, 1)), entries)
+            if details:
+                # Type, size and modification time come from the same scan, so
+                # clients need no follow-up request per entry
+                contents = ({
+                    "name": entry.name,
+                    "is_dir": entry.is_dir,
+                    "size": entry.size,
+                    "modified": entry.modified.timestamp() if entry.modified else None
+                } for entry in entries)
+            else:
+                contents = (entry.name for entry in entries)
+
+            def generate():
+                # Stream the JSON body so large listings start arriving immediately
+                yield b'{"type":"directory","path":' + orjson.dumps(path) + b',"contents":['
+                try:
+                    for i, item in enumerate(contents):
+                        yield (b"," if i else b"") + orjson.dumps(item)
+                except Exception as e:
+                    # The 200 status is already sent; keep the body valid JSON
+                    # and mark the listing as incomplete
+                    logger.error("Error listing directory '%s': %s", path, e)
+                    yield b'],"error":"Failed to read path"}'
+                    return
+                yield b"]}"
+
+            return Response(generate(), mimetype="application/json")
+
+    except CreateFailed as e:
+        logger.error("File system '%s' is unavailable: %s", fs_name, e)
+        return ERR_FS_UNAVAILABLE
     except Exception as e:
-        logger.error(f"Error reading path: {e}")
-        return jsonify({"error": "Failed to read path"}), 500
+        logger.error("Error reading path: %s", e)
+        return ERR_READ_FAILED
 
 # REST API endpoint to update (save content to a file)
 
 
 @api.route("/api/update", methods=["PUT"])
-def update():
+@require_fields("fs_name", "path", error=ERR_UPDATE_FIELDS_REQUIRED)
+def update(payload):
     """Save content to a file."""
     try:
-        payload = request.json
-        fs_name = payload.get("fs_name")
-        path = payload.get("path")
+        fs_name = payload["fs_name"]
+        path = payload["path"]
         content = payload.get("content")
 
-        logger.info(f"Update request received: fs_name={fs_name}, path={path}")
+        logger.info("Update request received: fs_name=%s, path=%s", fs_name, path)
 
-        if not fs_name or not path or content is None:
-            return jsonify({"error": "fs_name, path, and content are required"}), 400
+        # An empty string is valid content, so only a missing value is rejected
+        if content is None:
+            return ERR_UPDATE_FIELDS_REQUIRED
 
         result = app.save_content(fs_name=fs_name, path=path, content=content)
 
         if "error" in result:
-            return jsonify(result), 500
+            return ojsonify(result, 500)
 
-        return jsonify(result), 200
+        return ojsonify(result, 200)
 
     except Exception as e:
-        logger.error(f"Error saving content to file: {e}")
-        return jsonify({"error": "Failed to save content to file"}), 500
+        logger.error("Error saving content to file: %s", e)
+        return ERR_UPDATE_FAILED
 
 # REST API endpoint to rename a file or folder
 
 
 @api.route("/api/rename", methods=["PATCH"])
-def rename():
+@require_fields("fs_name", "old_path", "new_path", error=ERR_RENAME_FIELDS_REQUIRED)
+def rename(payload):
     """Rename a file or folder."""
     try:
-        payload = request.json
-        fs_name = payload.get("fs_name")
-        old_path = payload.get("old_path")
-        new_path = payload.get("new_path")
+        fs_name = payload["fs_name"]
+        old_path = payload["old_path"]
+        new_path = payload["new_path"]
 
         logger.info(
-            f"Rename request received: fs_name={fs_name}, old_path={old_path}, new_path={new_path}"
+            "Rename request received: fs_name=%s, old_path=%s, new_path=%s",
+            fs_name, old_path, new_path
         )
 
-        fs = app._adapters.get(fs_name)
+        fs = ADAPTERS.get(fs_name)
         if not fs:
-            logger.error(f"File system '{fs_name}' not found")
-            return jsonify({"error": f"File system '{fs_name}' not found"}), 404
+            logger.error("File system '%s' not found", fs_name)
+            return ojsonify({"error": f"File system '{fs_name}' not found"}, 404)
+
+        # Check if the old_path is a file or a folder with a single getinfo() call
+        try:
+            info = fs.getinfo(old_path)
+        except ResourceNotFound:
+            logger.error("Path '%s' does not exist", old_path)
+            return ojsonify({"error": f"Path '{old_path}' does not exist"}, 404)
 
-        # Check if the old_path is a file or a folder
-        if fs.isdir(old_path):
-            logger.info(f"Renaming folder: {old_path} -> {new_path}")
+        if info.is_dir:
+            logger.info("Renaming folder: %s -> %s", old_path, new_path)
             fs.movedir(old_path, new_path, create=True)
-        elif fs.isfile(old_path):
-            logger.info(f"Renaming file: {old_path} -> {new_path}")
-            fs.move(old_path, new_path)
         else:
-            logger.error(f"Path '{old_path}' does not exist")
-            return jsonify({"error": f"Path '{old_path}' does not exist"}), 404
+            logger.info("Renaming file: %s -> %s", old_path, new_path)
+            fs.move(old_path, new_path)
 
-        return jsonify({"message": "Renamed successfully"}), 200
+        return ojsonify({"message": "Renamed successfully"}, 200)
+    except CreateFailed as e:
+        logger.error("File system '%s' is unavailable: %s", fs_name, e)
+        return ERR_FS_UNAVAILABLE
     except Exception as e:
-        logger.error(f"Error renaming file or folder: {e}")
-        return jsonify({"error": "Failed to rename file or folder"}), 500
+        logger.error("Error renaming file or folder: %s", e)
+        return ERR_RENAME_FAILED
 
 # REST API endpoint to delete a file or folder
 
@@ -353,21 +752,21 @@ def delete():
         fs_name = request.args.get("fs_name")
         path = request.args.get("path")
 
-        logger.info(f"Delete request received: fs_name={fs_name}, path={path}")
+        logger.info("Delete request received: fs_name=%s, path=%s", fs_name, path)
 
         if not fs_name or not path:
-            return jsonify({"error": "fs_name and path are required"}), 400
+            return ERR_FS_NAME_AND_PATH_REQUIRED
 
         result = app.delete_item(fs_name=fs_name, path=path)
 
         if "error" in result:
-            return jsonify(result), 500
+            return ojsonify(result, 500)
 
-        return jsonify(result), 200
+        return ojsonify(result, 200)
 
     except Exception as e:
-        logger.error(f"Error deleting file or folder: {e}")
-        return jsonify({"error": "Failed to delete file or folder"}), 500
+        logger.error("Error deleting file or folder: %s", e)
+        return ERR_DELETE_FAILED
 
 # REST API endpoint to download a file
 
@@ -380,19 +779,38 @@ def download():
         path = request.args.get("path")
 
         logger.info(
-            f"Download request received: fs_name={fs_name}, path={path}")
+            "Download request received: fs_name=%s, path=%s", fs_name, path)
 
         if not fs_name or not path:
-            return jsonify({"error": "fs_name and path are required"}), 400
-
-        result = app.download_file(fs_name=fs_name, path=path)
+            return ERR_FS_NAME_AND_PATH_REQUIRED
+
+        # Files with a real path on disk (OSFS) are served by send_file, which
+        # supports conditional and Range requests. a2wsgi provides no
+        # wsgi.file_wrapper, so the body is still read in chunks, not sent
+        # with sendfile(2). validatepath() rejects paths that escape the
+        # file system root before it is mapped to disk.
+        fs = ADAPTERS.get(fs_name)
+        if fs is not None and fs.hassyspath(path):
+            return send_file(
+                fs.getsyspath(fs.validatepath(path)),
+                as_attachment=True,
+                conditional=True
+            )
+
+        result = app.open_file(fs_name=fs_name, path=path)
 
         if "error" in result:
-            return jsonify(result), 500
+            return ojsonify(result, 500)
+
+        # Stream the file in chunks so memory use does not grow with file size.
+        # wrap_file() uses the server's wsgi.file_wrapper if it has one;
+        # a2wsgi does not, so werkzeug's FileWrapper reads CHUNK_SIZE pieces.
+        body = wrap_file(request.environ, result["stream"], CHUNK_SIZE)
 
         # Return file content as attachment
         return Response(
-            result["content"],
+            body,
+            direct_passthrough=True,
             mimetype=result["mime_type"],
             headers={
                 "Content-Disposition": f'attachment; filename="{result["name"]}"',
@@ -400,9 +818,12 @@ def download():
             }
         )
 
+    except CreateFailed as e:
+        logger.error("File system '%s' is unavailable: %s", fs_name, e)
+        return ERR_FS_UNAVAILABLE
     except Exception as e:
-        logger.error(f"Error downloading file: {e}")
-        return jsonify({"error": "Failed to download file"}), 500
+        logger.error("Error downloading file: %s", e)
+        return ERR_DOWNLOAD_FAILED
 
 # REST API endpoint to upload a file
 
@@ -415,108 +836,123 @@ def upload():
         path = request.form.get("path", "/")
 
         if not fs_name:
-            return jsonify({"error": "fs_name is required"}), 400
+            return ERR_FS_NAME_REQUIRED
 
         if "file" not in request.files:
-            return jsonify({"error": "No file provided"}), 400
+            return ERR_NO_FILE_PROVIDED
 
         file = request.files["file"]
         if file.filename == "":
-            return jsonify({"error": "No file selected"}), 400
+            return ERR_NO_FILE_SELECTED
 
-        content = file.read()
-        result = app.upload_file(
+        # Stream the upload to its destination instead of reading it into memory
+        result = app.upload_file_stream(
             fs_name=fs_name,
             path=path,
             file_name=file.filename,
-            content=content
+            stream=file.stream,
+            chunk_size=CHUNK_SIZE
         )
 
         if "error" in result:
-            return jsonify(result), 500
+            return ojsonify(result, 500)
 
-        return jsonify(result), 201
+        return ojsonify(result, 201)
 
+    except RequestEntityTooLarge:
+        return ERR_UPLOAD_TOO_LARGE
     except Exception as e:
-        logger.error(f"Error uploading file: {e}")
-        return jsonify({"error": "Failed to upload file"}), 500
+        logger.error("Error uploading file: %s", e)
+        return ERR_UPLOAD_FAILED
 
 # REST API endpoint to handle login requests
 
 
-@api.route("/api/login", methods=["POST", "OPTIONS"])
+@api.route("/api/login", methods=["POST"])
 def login():
     """Handle login requests"""
-    if request.method == "OPTIONS":
-        response = make_response()
-        return response, 200
-
+    # Preflight OPTIONS requests are answered by Flask's automatic OPTIONS
+    # handling, with the CORS headers added by Flask-CORS
     try:
         payload = request.json
         access_code = payload.get("accessCode")
 
         if not access_code:
-            return jsonify({"error": "Access code is required"}), 400
-
-        # Get the stored hash from the database
-        conn = sqlite3.connect(os.path.join(
-            os.path.dirname(__file__), 'users.db'))
-        try:
-            cur = conn.cursor()
-            cur.execute('SELECT access_code FROM access LIMIT 1')
-            row = cur.fetchone()
-            if not row:
-                return jsonify({"error": "Authentication failed"}), 401
-
-            stored_hash = row[0]
-
-            # Verify the access code
-            if bcrypt.checkpw(access_code.encode('utf-8'), stored_hash.encode('utf-8')):
-                # Create a session token
-                session_token = jwt.encode(
-                    {
-                        'exp': datetime.datetime.utcnow() + datetime.timedelta(days=7),
-                        'iat': datetime.datetime.utcnow(),
-                    },
-                    SECRET_KEY,
-                    algorithm='HS256'
-                )
-
-                response = jsonify({
-                    "success": True,
-                    "message": "Login successful"
-                })
-
-                # Set secure cookie with session token
-                response.set_cookie(
-                    'session_token',
-                    session_token,
-                    httponly=True,
-                    secure=True,
-                    samesite='Strict',
-                    max_age=7 * 24 * 60 * 60  # 7 days
-                )
-
-                return response, 200
-            else:
-                return jsonify({"error": "Invalid access code"}), 401
-
-        finally:
-            conn.close()
+            return ERR_ACCESS_CODE_REQUIRED
+
+        # Get the cached hash of the stored access code
+        stored_hash = ACCESS_CODE.hash
+        if not stored_hash:
+            return ERR_AUTHENTICATION_FAILED
+
+        # Verify the access code
+        if bcrypt.checkpw(access_code.encode('utf-8'), stored_hash):
+            # Rehash with the configured work factor, so changing BCRYPT_COST
+            # takes effect on the next successful login
+            if BCRYPT_COST and bcrypt_cost(stored_hash) != BCRYPT_COST:
+                ACCESS_CODE.replace(stored_hash, bcrypt.hashpw(
+                    access_code.encode('utf-8'), bcrypt.gensalt(BCRYPT_COST)))
+
+            # Create a session token
+            session_token = jwt.encode(
+                {
+                    'exp': datetime.datetime.utcnow() + datetime.timedelta(days=7),
+                    'iat': datetime.datetime.utcnow(),
+                },
+                SECRET_KEY,
+                algorithm='HS256'
+            )
+
+            response = ojsonify({
+                "success": True,
+                "message": "Login successful"
+            })
+
+            # Set secure cookie with session token
+            response.set_cookie(
+                'session_token',
+                session_token,
+                httponly=True,
+                secure=True,
+                samesite='Strict',
+                max_age=7 * 24 * 60 * 60  # 7 days
+            )
+
+            return response, 200
+        else:
+            return ERR_INVALID_ACCESS_CODE
 
     except Exception as e:
-        logger.error(f"Login error: {e}")
-        return jsonify({"error": f"Login failed: {str(e)}"}), 500
+        logger.error("Login error: %s", e)
+        return ojsonify({"error": f"Login failed: {str(e)}"}, 500)
 
 
-# Expose app and api instances for Uvicorn
+# Serve both apps from a single server. a2wsgi's WSGIMiddleware runs each
+# request in a thread pool off the event loop and streams request and
+# response bodies with backpressure; the endpoints are I/O-bound, so the
+# pool size (WSGI_THREADS) bounds how many file operations overlap. The
+# default follows ThreadPoolExecutor's sizing for I/O-bound work.
+WSGI_THREADS = int(os.getenv("WSGI_THREADS", min(32, (os.cpu_count() or 1) * 4)))
 wsgi_app = AuthMiddleware(app)
-app_instance = WSGIMiddleware(wsgi_app)  # Wrap for Uvicorn compatibility
-api_instance = WSGIMiddleware(api)
+combined_app = PathDispatcher(wsgi_app, api)
+app_instance = WSGIMiddleware(combined_app, workers=WSGI_THREADS)  # Wrap for Uvicorn compatibility
 
 if __name__ == "__main__":
-    # Use Waitress to serve the application (if needed)
-    logger.info("Starting Waitress server on http://127.0.0.1:8006")
-    serve(api_instance, host="127.0.0.1", port=8006)
-    logger.info("Starting Flask API server on http://127.0.0.1:8005")
-    serve(wsgi_app, host="127.0.0.1", port=8005)
+    # Serve with Uvicorn: httptools parses HTTP in C and uvloop runs the
+    # event loop where available. A single worker process is the default:
+    # the virtual directory, the adapters, the read and session caches and
+    # the access code hash all live in process memory and are not shared.
+    # WORKERS > 1 is an explicit opt-in and is unsafe with the in-memory
+    # virtual directory, whose contents would differ between workers.
+    # Multiple workers require the app to be passed as an import string,
+    # which imports this file again as "main"; a single worker serves the
+    # app object built here, so startup runs only once.
+    workers = int(os.getenv("WORKERS", 1))
+    if workers > 1:
+        logger.warning(
+            "Running %d worker processes; the in-memory virtual directory "
+            "and caches are not shared between them", workers)
+    logger.info("Starting server on http://127.0.0.1:8006")
+    uvicorn.run(app_instance if workers == 1 else "main:app_instance",
+                host="127.0.0.1", port=8006,
+                http="httptools", loop="auto", workers=workers)
@@ -1,8 +1,15 @@
 import unittest
 from werkzeug.test import Client, EnvironBuilder
-from vuefinder import VuefinderApp, fill_fs
+from vuefinder import VuefinderApp, IndexedMemoryFS, LazyFS, copy_stream, fill_fs, is_valid_name
+from pathvalidate import is_valid_filename
+from fs.errors import CreateFailed
 from fs.memoryfs import MemoryFS
+from fs.zipfs import ZipFS
 import urllib.parse
+import io
+import json
+import tempfile
+import zipfile
 import concurrent.futures
 from unittest.mock import Mock
 
@@ -22,6 +29,7 @@ def create_test_app() -> VuefinderApp:
         },
     )
     app.add_fs("m1", m1)
+    app.enable()
     return app
 
 
@@ -71,3 +79,194 @@ class TestApp(unittest.TestCase):
 
         for res in results:
             self.assertEqual(res, 200)
+
+    def test_enabled_per_request(self):
+        app = create_test_app()
+        app.disable()
+        client = Client(app)
+
+        params = {"q": "index", "adapter": "m1", "path": "m1://"}
+        url = "/?" + urllib.parse.urlencode(params)
+        resp = client.get(url)
+        self.assertEqual(resp.status_code, 401)
+
+        resp = client.get(url, environ_base={VuefinderApp.ENABLED_ENVIRON_KEY: True})
+        self.assertEqual(resp.status_code, 200)
+        self.assertFalse(app.enabled)
+
+    def test_open_file_streams(self):
+        app = create_test_app()
+
+        result = app.open_file("m1", "foo/file.txt")
+        with result["stream"] as f:
+            self.assertEqual(result["size"], 12)
+            self.assertEqual(result["mime_type"], "text/plain")
+            self.assertEqual(f.read(5), b"Hello")
+            self.assertEqual(f.read(), b" World!")
+
+        self.assertIn("error", app.open_file("m1", "foo/bar"))
+
+    def test_upload_keeps_file_names(self):
+        app = create_test_app()
+        client = Client(app)
+
+        params = {"q": "upload", "adapter": "m1", "path": "m1://foobar"}
+        url = "/?" + urllib.parse.urlencode(params)
+        data = {"files[]": [(io.BytesIO(b"one"), "one.txt"), (io.BytesIO(b"two"), "two.txt")]}
+        resp = client.post(url, data=data)
+        self.assertEqual(resp.status_code, 200)
+
+        fs = app._adapters["m1"]
+        self.assertEqual(fs.readtext("foobar/one.txt"), "one")
+        self.assertEqual(fs.readtext("foobar/two.txt"), "two")
+
+        data = {"name": "renamed.txt", "file": (io.BytesIO(b"three"), "three.txt")}
+        resp = client.post(url, data=data)
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(fs.readtext("foobar/renamed.txt"), "three")
+
+        data = {"file": (io.BytesIO(b"bad"), "bad?.txt")}
+        resp = client.post(url, data=data)
+        self.assertEqual(resp.status_code, 400)
+
+    def test_mutation_without_full_listing(self):
+        app = create_test_app()
+        client = Client(app)
+
+        def post(q, payload):
+            params = {"q": q, "adapter": "m1", "path": "m1://foo", "full": "0"}
+            resp = client.post("/?" + urllib.parse.urlencode(params), json=payload)
+            self.assertEqual(resp.status_code, 200)
+            self.assertEqual(resp.json["adapter"], "m1")
+            self.assertEqual(resp.json["dirname"], "m1://foo")
+            return resp.json["files"]
+
+        files = post("newfolder", {"name": "new"})
+        self.assertEqual([(f["path"], f["type"]) for f in files], [("m1://foo/new", "dir")])
+
+        files = post("rename", {"item": "m1://foo/file.txt", "name": "renamed.txt"})
+        self.assertEqual([(f["path"], f["type"]) for f in files], [("m1://foo/renamed.txt", "file")])
+        self.assertEqual(files[0]["file_size"], 12)
+
+        files = post("delete", {"items": [{"path": "m1://foo/renamed.txt"}, {"path": "m1://foo/bar"}]})
+        self.assertEqual(files, [])
+        self.assertListEqual(sorted(app._adapters["m1"].listdir("foo")), ["foo.txt", "new"])
+
+    def test_download_archive(self):
+        app = create_test_app()
+        client = Client(app)
+
+        selections = {
+            "m1://": (["m1://foo"], {
+                "foo/": b"", "foo/bar/": b"", "foo/bar/baz": b"",
+                "foo/file.txt": b"Hello World!", "foo/foo.txt": b"foo bar baz",
+            }),
+            "m1://foo": (["m1://foo/bar", "m1://foo/file.txt"], {
+                "bar/": b"", "bar/baz": b"", "file.txt": b"Hello World!",
+            }),
+        }
+        for path, (paths, expected) in selections.items():
+            params = {"q": "download_archive", "adapter": "m1", "path": path,
+                      "name": "archive", "paths": json.dumps(paths)}
+            resp = client.get("/?" + urllib.parse.urlencode(params))
+            self.assertEqual(resp.status_code, 200)
+            data = resp.get_data()
+            self.assertEqual(int(resp.headers["Content-Length"]), len(data))
+            self.assertIn('filename="archive.zip"', resp.headers["Content-Disposition"])
+
+            with zipfile.ZipFile(io.BytesIO(data)) as archive:
+                contents = {name: archive.read(name) for name in archive.namelist()}
+            self.assertDictEqual(contents, expected)
+
+    def test_unarchive_conflict_ignores_case(self):
+        app = create_test_app()
+        fs = app._adapters["m1"]
+        with ZipFS(fs.openbin("foobar/archive.zip", "w"), write=True) as zip:
+            zip.writetext("HELLO.TXT", "Overwritten!")
+
+        params = {"q": "unarchive", "adapter": "m1", "path": "m1://foobar"}
+        url = "/?" + urllib.parse.urlencode(params)
+        client = Client(app)
+
+        fs._meta["case_insensitive"] = True
+        resp = client.post(url, json={"item": "m1://foobar/archive.zip"})
+        self.assertEqual(resp.status_code, 400)
+        self.assertEqual(fs.readtext("foobar/hello.txt"), "Hello!")
+
+        # Where case matters the names do not collide
+        fs._meta["case_insensitive"] = False
+        resp = client.post(url, json={"item": "m1://foobar/archive.zip"})
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(fs.readtext("foobar/HELLO.TXT"), "Overwritten!")
+
+    def test_unavailable_fs(self):
+        app = create_test_app()
+        app.add_fs("bad", LazyFS(Mock(side_effect=CreateFailed("not a directory"))))
+        client = Client(app)
+
+        params = {"q": "index", "adapter": "bad", "path": "bad://"}
+        resp = client.get("/?" + urllib.parse.urlencode(params))
+        self.assertEqual(resp.status_code, 503)
+        self.assertFalse(resp.json["status"])
+
+
+class TestIndexedMemoryFS(unittest.TestCase):
+    def test_index_follows_changes(self):
+        m1 = IndexedMemoryFS()
+        fill_fs(m1, {"foo": {"file.txt": "Hello World!", "bar": {"baz": None}}})
+        self.assertTrue(m1.isfile("foo/file.txt"))
+        self.assertTrue(m1.isdir("foo/bar"))
+
+        m1.move("foo/file.txt", "foo/moved.txt")
+        self.assertFalse(m1.exists("foo/file.txt"))
+        self.assertEqual(m1.readtext("foo/moved.txt"), "Hello World!")
+
+        m1.removetree("foo/bar")
+        self.assertFalse(m1.exists("foo/bar/baz"))
+        m1.makedir("foo/bar")
+        self.assertListEqual(m1.listdir("foo/bar"), [])
+
+
+class TestLazyFS(unittest.TestCase):
+    def test_created_on_first_use(self):
+        factory = Mock(side_effect=MemoryFS)
+        lazy = LazyFS(factory)
+        factory.assert_not_called()
+
+        lazy.writetext("hello.txt", "Hello!")
+        self.assertEqual(lazy.readtext("hello.txt"), "Hello!")
+        factory.assert_called_once()
+
+
+class TestCopyStream(unittest.TestCase):
+    def test_copies_rest_of_stream(self):
+        data = bytes(range(256)) * 1000
+        with tempfile.TemporaryFile() as src, tempfile.TemporaryFile() as dst:
+            src.write(data)
+            src.seek(10)
+            dst.write(b"head")
+            copy_stream(src, dst)
+            dst.seek(0)
+            self.assertEqual(dst.read(), b"head" + data[10:])
+
+        dst = io.BytesIO()
+        copy_stream(io.BytesIO(data), dst, chunk_size=1000)
+        self.assertEqual(dst.getvalue(), data)
+
+    def test_keeps_spooled_upload_in_memory(self):
+        for dst in (io.BytesIO(), tempfile.TemporaryFile()):
+            with dst, tempfile.SpooledTemporaryFile(max_size=1024) as src:
+                src.write(b"x" * 100)
+                src.seek(0)
+                copy_stream(src, dst)
+                self.assertFalse(src._rolled)
+                dst.seek(0)
+                self.assertEqual(dst.read(), b"x" * 100)
+
+
+class TestIsValidName(unittest.TestCase):
+    def test_matches_pathvalidate(self):
+        names = ["file.txt", "a (1).tar.gz", "[x]", ".hidden", "CON", "con.txt",
+                 "lpt1", "com0.log", "CONIN$", "a.", "a ", " a", "a/b", "é.txt", "a" * 300]
+        for name in names:
+            self.assertEqual(is_valid_name(name), is_valid_filename(name, platform="universal"), name)
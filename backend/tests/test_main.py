@@ -0,0 +1,241 @@
+import os
+import sqlite3
+import tempfile
+import time
+import unittest
+from unittest.mock import Mock, patch
+import jwt
+from fs.errors import CreateFailed, PermissionDenied
+from fs.memoryfs import MemoryFS
+from fs.osfs import OSFS
+from werkzeug.test import Client, EnvironBuilder
+from vuefinder import LazyFS
+
+os.environ.setdefault("API_KEY", "test-key")
+DB_FILES = [
+    os.path.join(os.path.dirname(os.path.dirname(__file__)), "users.db" + suffix)
+    for suffix in ("", "-wal", "-shm")
+]
+# Importing main opens users.db; remove it afterwards unless it was already there
+CREATED_DB_FILES = [f for f in DB_FILES if not os.path.exists(f)]
+
+import main  # noqa: E402
+
+
+def tearDownModule():
+    with main.ACCESS_CODE._lock:
+        if main.ACCESS_CODE._conn is not None:
+            main.ACCESS_CODE._conn.close()
+            main.ACCESS_CODE._conn = None
+    for f in CREATED_DB_FILES:
+        if os.path.exists(f):
+            os.remove(f)
+
+
+class FailingScanFS(MemoryFS):
+    """MemoryFS whose directory scans fail after yielding `fail_after` entries."""
+
+    def __init__(self, fail_after: int):
+        super().__init__()
+        self.fail_after = fail_after
+
+    def scandir(self, path, namespaces=None, page=None):
+        for i, info in enumerate(super().scandir(path, namespaces, page)):
+            if i == self.fail_after:
+                break
+            yield info
+        raise PermissionDenied(path)
+
+
+class TestAccessCodeStore(unittest.TestCase):
+    def test_replace_after_concurrent_change(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            db_path = os.path.join(tmp, "users.db")
+            with sqlite3.connect(db_path) as conn:
+                conn.execute("CREATE TABLE access (access_code TEXT)")
+                conn.execute("INSERT INTO access VALUES ('old')")
+            conn.close()
+            store = main.AccessCodeStore(db_path)
+
+            store.replace(b"old", b"new")
+            self.assertEqual(store.hash, b"new")
+
+            # Another process rotates the code before this one rehashes it
+            with sqlite3.connect(db_path) as conn:
+                conn.execute("UPDATE access SET access_code = 'other'")
+            conn.close()
+            store.replace(b"new", b"rehashed")
+            self.assertEqual(store.hash, b"other")
+            store._conn.close()
+
+    def test_keeps_hash_when_reload_fails(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            db_path = os.path.join(tmp, "users.db")
+            with sqlite3.connect(db_path) as conn:
+                conn.execute("CREATE TABLE access (access_code TEXT)")
+                conn.execute("INSERT INTO access VALUES ('h')")
+            conn.close()
+            store = main.AccessCodeStore(db_path)
+            self.assertEqual(store.hash, b"h")
+
+            with sqlite3.connect(db_path) as conn:
+                conn.execute("ALTER TABLE access RENAME TO moved")
+            conn.close()
+            self.assertEqual(store.refresh(), b"h")
+
+            # An empty table means the access code was removed on purpose
+            with sqlite3.connect(db_path) as conn:
+                conn.execute("ALTER TABLE moved RENAME TO access")
+                conn.execute("DELETE FROM access")
+            conn.close()
+            self.assertIsNone(store.refresh())
+            store._conn.close()
+
+
+def session_token(exp: float) -> str:
+    return jwt.encode({"exp": int(exp)}, main.SECRET_KEY, algorithm="HS256")
+
+
+def get_request(*args, **kwargs):
+    return EnvironBuilder(*args, **kwargs).get_request()
+
+
+class TestApiKeyMiddleware(unittest.TestCase):
+    def test_empty_key_rejects_requests_without_header(self):
+        wrapped = Mock(return_value=[b"ok"])
+        client = Client(main.ApiKeyMiddleware(wrapped, b""))
+
+        resp = client.get("/api/list_fs")
+        self.assertEqual(resp.status_code, 401)
+        resp = client.get("/api/list_fs", headers={"x-api-key": ""})
+        self.assertEqual(resp.status_code, 401)
+        wrapped.assert_not_called()
+
+    def test_rejection_has_cors_headers(self):
+        client = main.api.test_client()
+        origin = main.ALLOWED_ORIGINS[0]
+
+        resp = client.get("/api/list_fs", headers={"x-api-key": "wrong", "Origin": origin})
+        self.assertEqual(resp.status_code, 401)
+        self.assertEqual(resp.json, {"error": "Unauthorized: Invalid API Key"})
+        self.assertEqual(resp.headers["Access-Control-Allow-Origin"], origin)
+        self.assertEqual(resp.headers["Access-Control-Allow-Credentials"], "true")
+
+        resp = client.get("/api/list_fs", headers={"Origin": "http://elsewhere.example"})
+        self.assertEqual(resp.status_code, 401)
+        self.assertNotIn("Access-Control-Allow-Origin", resp.headers)
+
+
+class TestAuthMiddleware(unittest.TestCase):
+    def setUp(self):
+        self.auth = main.AuthMiddleware(main.app)
+
+    def test_preview_token_in_url_is_ignored(self):
+        token = session_token(time.time() + 60)
+        request = get_request("/?q=preview&token=" + token)
+        self.assertFalse(self.auth.verify_access(request))
+
+        request = get_request("/?q=preview", headers={"Cookie": "session_token=" + token})
+        self.assertTrue(self.auth.verify_access(request))
+
+    def test_cached_token_expires(self):
+        now = time.time()
+        token = session_token(now + 60)
+        request = get_request("/?q=index", headers={"Cookie": "session_token=" + token})
+        self.assertTrue(self.auth.verify_access(request))
+        self.assertGreater(main.decode_session_token.cache_info().currsize, 0)
+
+        # Decoded and cached while valid; rejected once past its exp
+        with patch.object(main.time, "time", return_value=now + 61):
+            self.assertFalse(self.auth.verify_access(request))
+
+
+class TestListFs(unittest.TestCase):
+    def test_not_modified(self):
+        client = main.api.test_client()
+        headers = {"x-api-key": main.API_KEY}
+
+        resp = client.get("/api/list_fs", headers=headers)
+        self.assertEqual(resp.status_code, 200)
+        self.assertIn("virtual_directory", resp.json["file_systems"])
+        etag = resp.headers["ETag"]
+
+        resp = client.get("/api/list_fs", headers={**headers, "If-None-Match": etag})
+        self.assertEqual(resp.status_code, 304)
+        self.assertEqual(resp.data, b"")
+
+
+class TestRead(unittest.TestCase):
+    def setUp(self):
+        self.client = main.api.test_client()
+        self.headers = {"x-api-key": main.API_KEY}
+
+    def tearDown(self):
+        main.app.remove_fs("mem")
+
+    def read_dir(self, fail_after: int):
+        fs = FailingScanFS(fail_after)
+        fs.makedir("dir")
+        for name in ("a.txt", "b.txt"):
+            fs.writetext("dir/" + name, "")
+        main.app.add_fs("mem", fs)
+        return self.client.get(
+            "/api/read?fs_name=mem&path=dir", headers=self.headers)
+
+    def test_scan_error_before_listing(self):
+        resp = self.read_dir(fail_after=0)
+        self.assertEqual(resp.status_code, 500)
+        self.assertEqual(resp.json, {"error": "Failed to read path"})
+
+    def test_scan_error_during_listing(self):
+        resp = self.read_dir(fail_after=1)
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(len(resp.json["contents"]), 1)
+        self.assertEqual(resp.json["error"], "Failed to read path")
+
+    def test_text_with_media_extension(self):
+        fs = MemoryFS()
+        fs.writetext("app.ts", "export {};")
+        fs.writebytes("image.png", b"\x89PNG")
+        main.app.add_fs("mem", fs)
+
+        resp = self.client.get("/api/read?fs_name=mem&path=app.ts", headers=self.headers)
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(resp.json["content"], "export {};")
+
+        resp = self.client.get("/api/read?fs_name=mem&path=image.png", headers=self.headers)
+        self.assertEqual(resp.status_code, 400)
+
+    def test_unavailable_fs(self):
+        main.app.add_fs("mem", LazyFS(Mock(side_effect=CreateFailed("not a directory"))))
+
+        resp = self.client.get("/api/read?fs_name=mem&path=/", headers=self.headers)
+        self.assertEqual(resp.status_code, 503)
+        self.assertEqual(resp.json, {"error": "File system is unavailable"})
+
+
+class TestDownload(unittest.TestCase):
+    def setUp(self):
+        self.client = main.api.test_client()
+        self.headers = {"x-api-key": main.API_KEY}
+        self.tmp = tempfile.TemporaryDirectory()
+        os.mkdir(os.path.join(self.tmp.name, "mount"))
+        for name, content in (("mount/file.txt", "inside"), ("secret.txt", "outside")):
+            with open(os.path.join(self.tmp.name, name), "w") as f:
+                f.write(content)
+        main.app.add_fs("disk", OSFS(os.path.join(self.tmp.name, "mount")))
+
+    def tearDown(self):
+        main.app.remove_fs("disk")
+        self.tmp.cleanup()
+
+    def test_download_from_disk(self):
+        resp = self.client.get("/api/download?fs_name=disk&path=file.txt", headers=self.headers)
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(resp.data, b"inside")
+        resp.close()
+
+    def test_path_outside_root_is_refused(self):
+        resp = self.client.get("/api/download?fs_name=disk&path=../secret.txt", headers=self.headers)
+        self.assertEqual(resp.status_code, 500)
+        self.assertEqual(resp.json, {"error": "Failed to download file"})
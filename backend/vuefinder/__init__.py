@@ -1,22 +1,92 @@
 from http import HTTPStatus
-from typing import Iterable, Mapping
+from typing import BinaryIO, Callable, Iterable, Mapping
 from werkzeug.wrappers import Request, Response
 from werkzeug.exceptions import BadRequest
+from werkzeug.wsgi import wrap_file
 from fs.base import FS
 from fs.info import Info
+from fs.memoryfs import MemoryFS
+from fs.mode import Mode
 from fs.subfs import SubFS
+from fs.wrapfs import WrapFS
 from fs.zipfs import ZipFS
 from fs import path as fspath, errors, copy, walk
 import json
 import mimetypes
+try:
+    from orjson import dumps as json_dumps
+except ImportError:  # orjson is optional; fall back to the standard library
+    def json_dumps(obj) -> bytes:
+        return json.dumps(obj).encode()
 from shutil import copyfileobj
-from collections import OrderedDict
+from tempfile import SpooledTemporaryFile
+from collections import deque
 from pathvalidate import is_valid_filename
+import functools
 import io
 import logging
+import os
+import posixpath
+import re
+import threading
 
 logger = logging.getLogger(__name__)
 
+# Size of the chunks used to stream file contents
+CHUNK_SIZE = 1 << 20  # 1 MiB
+# Downloaded archives larger than this are buffered on disk, not in memory
+ARCHIVE_SPOOL_SIZE = 64 << 20  # 64 MiB
+
+# Plain ASCII names with no leading/trailing space or trailing dot, which
+# pathvalidate accepts as long as their stem is not a reserved device name
+_SAFE_FILENAME = re.compile(r"[\w\-()\[\]]([\w\-. ()\[\]]{0,253}[\w\-()\[\]])?", re.ASCII)
+_RESERVED_STEMS = frozenset(
+    ["CON", "PRN", "AUX", "CLOCK$", "NUL"]
+    + [f"{p}{i}" for p in ("COM", "LPT") for i in range(10)]
+)
+
+
+def is_valid_name(name: str) -> bool:
+    """Same result as pathvalidate's universal is_valid_filename(), with a
+    regex fast path for the common case of plain ASCII names."""
+    if _SAFE_FILENAME.fullmatch(name) and name.split(".", 1)[0].upper() not in _RESERVED_STEMS:
+        return True
+    return is_valid_filename(name, platform="universal")
+
+
+def copy_stream(src: BinaryIO, dst: BinaryIO, chunk_size: int = CHUNK_SIZE):
+    """Copy the rest of src to dst.
+
+    When both are regular files (e.g. a spooled upload and an OSFS file),
+    the data is copied inside the kernel with copy_file_range(2) where
+    available; otherwise it goes through Python in chunk_size pieces.
+    """
+    # fileno() on a SpooledTemporaryFile writes its buffer to disk, so an
+    # upload still held in memory is copied through Python instead
+    if hasattr(os, "copy_file_range") and getattr(src, "_rolled", True):
+        try:
+            # Ask dst first; for a MemoryFS destination src is never touched
+            dst_fd = dst.fileno()
+            src_fd = src.fileno()
+        except (AttributeError, OSError):  # In-memory streams have no fileno
+            pass
+        else:
+            # Explicit offsets, since the file objects may buffer
+            dst.flush()
+            src_pos, dst_pos = src.tell(), dst.tell()
+            try:
+                while n := os.copy_file_range(src_fd, dst_fd, 1 << 30, src_pos, dst_pos):
+                    src_pos += n
+                    dst_pos += n
+                done = True
+            except OSError:  # Not supported for this pair of files
+                done = False
+            src.seek(src_pos)
+            dst.seek(dst_pos)
+            if done:
+                return
+    copyfileobj(src, dst, chunk_size)
+
 
 def fill_fs(fs: FS, d: dict):
     for k, v in d.items():
@@ -31,8 +101,104 @@ def fill_fs(fs: FS, d: dict):
             fill_fs(SubFS(fs, k), v)
 
 
+class IndexedMemoryFS(MemoryFS):
+    """A MemoryFS that indexes resolved paths.
+
+    MemoryFS resolves every path by walking the tree from the root. This
+    subclass keeps a dict of normalized path -> directory entry, so repeated
+    lookups are a single dict probe. The index is cleared by every operation
+    that can change the tree structure.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self._index: dict[str, object] = {}
+
+    def _get_dir_entry(self, dir_path):
+        with self._lock:
+            dir_path = fspath.normpath(dir_path)
+            entry = self._index.get(dir_path)
+            if entry is None:
+                entry = super()._get_dir_entry(dir_path)
+                if entry is not None:
+                    self._index[dir_path] = entry
+            return entry
+
+    def makedir(self, path, permissions=None, recreate=False):
+        with self._lock:
+            self._index.clear()
+            return super().makedir(path, permissions=permissions, recreate=recreate)
+
+    def move(self, src_path, dst_path, overwrite=False, preserve_time=False):
+        with self._lock:
+            self._index.clear()
+            return super().move(src_path, dst_path, overwrite=overwrite, preserve_time=preserve_time)
+
+    def movedir(self, src_path, dst_path, create=False, preserve_time=False):
+        with self._lock:
+            self._index.clear()
+            return super().movedir(src_path, dst_path, create=create, preserve_time=preserve_time)
+
+    def openbin(self, path, mode="r", buffering=-1, **options):
+        with self._lock:
+            # Reading never changes the tree, so only writes invalidate the index
+            if Mode(mode).writing:
+                self._index.clear()
+            return super().openbin(path, mode=mode, buffering=buffering, **options)
+
+    def remove(self, path):
+        with self._lock:
+            self._index.clear()
+            return super().remove(path)
+
+    def removedir(self, path):
+        with self._lock:
+            self._index.clear()
+            return super().removedir(path)
+
+    def removetree(self, path):
+        with self._lock:
+            self._index.clear()
+            return super().removetree(path)
+
+
+class LazyFS(WrapFS):
+    """A filesystem that is only created on first use.
+
+    Wraps the FS returned by factory, which is called the first time the
+    filesystem is accessed rather than when it is registered. Registering
+    many filesystems, e.g. on network mounts, then costs nothing until a
+    request actually touches one of them.
+    """
+
+    def __init__(self, factory: Callable[[], FS]):
+        self._factory = factory
+        self._create_lock = threading.Lock()
+        super().__init__(None)
+
+    @property
+    def _wrap_fs(self) -> FS:
+        fs = self._fs
+        if fs is None:
+            with self._create_lock:
+                if self._fs is None:
+                    self._fs = self._factory()
+                fs = self._fs
+        return fs
+
+    @_wrap_fs.setter
+    def _wrap_fs(self, fs: FS | None):
+        self._fs = fs
+
+    def __repr__(self):
+        return f"{self.__class__.__name__}({self._factory!r})"
+
+
 def json_response(response, status: int = 200) -> Response:
-    payload = json.dumps(response)
+    return json_bytes_response(json_dumps(response), status)
+
+
+def json_bytes_response(payload: bytes, status: int = 200) -> Response:
     return Response(
         response=payload,
         mimetype="application/json",
@@ -41,54 +207,121 @@ def json_response(response, status: int = 200) -> Response:
     )
 
 
+# Body of every unauthorized response, encoded once
+_UNAUTHORIZED = json_dumps({"error": "Unauthorized"})
+
+
+# Load the system mime types once at import rather than on the first lookup
+if not mimetypes.inited:
+    mimetypes.init()
+
+
+def guess_mime_type(name: str) -> str | None:
+    """mimetypes.guess_type(name)[0], cached per file extension."""
+    root, ext = posixpath.splitext(name)
+    encodings = mimetypes.encodings_map
+    if ext in encodings or ext.lower() in encodings:
+        # e.g. "a.tar.gz": the type comes from the extension before ".gz"
+        ext = posixpath.splitext(root)[1] + ext
+    return _guess_mime_type_for(ext)
+
+
+@functools.lru_cache(maxsize=8192)
+def _guess_mime_type_for(ext: str) -> str | None:
+    return mimetypes.guess_type("x" + ext)[0] if ext else None
+
+
 def to_vuefinder_resource(storage: str, path: str, info: Info) -> dict:
     if path == "/":
         path = ""
+    # Read the raw namespaces directly; the Info properties validate the
+    # namespace and convert timestamps to datetimes on every access
+    raw = info.raw
+    basic = raw["basic"]
+    details = raw.get("details", {})
+    name = basic["name"]
     return {
-        "type": "dir" if info.is_dir else "file",
-        "path": f"{storage}:/{path}/{info.name}",
+        "type": "dir" if basic["is_dir"] else "file",
+        "path": f"{storage}:/{path}/{name}",
         "visibility": "public",
-        "last_modified": info.modified.timestamp() if info.modified else None,
-        "mime_type": mimetypes.guess_type(info.name)[0],
+        # Stored as a Unix timestamp already
+        "last_modified": details.get("modified"),
+        "mime_type": guess_mime_type(name),
         "extra_metadata": [],
-        "basename": info.name,
-        "extension": info.name.split(".")[-1],
+        "basename": name,
+        # Text after the last dot, or the whole name if it has none
+        "extension": name[name.rfind(".") + 1:],
         "storage": storage,
-        "file_size": info.size,
+        "file_size": details.get("size"),
     }
 
 
 class Adapter(object):
+    # Created for every request, so skip the per-instance __dict__
+    __slots__ = ("key", "fs")
+
     def __init__(self, key: str, fs: FS):
         self.key = key
         self.fs = fs
 
 
 class VuefinderApp(object):
+    # WSGI environ key a middleware sets to a true value to enable the app
+    # for a single request, without touching the shared enabled flag
+    ENABLED_ENVIRON_KEY = "vuefinder.enabled"
+
+    # (method, q) -> name of the handler method
+    ENDPOINTS = {
+        ("GET", "index"): "_index",
+        ("GET", "preview"): "_preview",
+        ("GET", "subfolders"): "_subfolders",
+        ("GET", "download"): "_download",
+        ("GET", "download_archive"): "_download_archive",
+        ("GET", "search"): "_search",
+        ("POST", "newfolder"): "_newfolder",
+        ("POST", "newfile"): "_newfile",
+        ("POST", "rename"): "_rename",
+        ("POST", "move"): "_move",
+        ("POST", "delete"): "_delete",
+        ("POST", "upload"): "_upload",
+        ("POST", "archive"): "_archive",
+        ("POST", "unarchive"): "_unarchive",
+        ("POST", "save"): "_save",
+    }
+
+    # CORS headers sent with every response besides Access-Control-Allow-Origin
+    _CORS_HEADERS = [
+        ("Access-Control-Allow-Methods", "GET, POST, PUT, DELETE, OPTIONS, PATCH"),
+        ("Access-Control-Allow-Headers", "Content-Type, Authorization, x-api-key"),
+        ("Access-Control-Allow-Credentials", "true"),
+        ("Access-Control-Expose-Headers", "Content-Type, Authorization"),
+    ]
+
     def __init__(self, enable_cors: bool = False):
+        # Bind the handlers once; dispatch is a single tuple-keyed lookup
         self.endpoints = {
-            "GET:index": self._index,
-            "GET:preview": self._preview,
-            "GET:subfolders": self._subfolders,
-            "GET:download": self._download,
-            "GET:download_archive": self._download_archive,
-            "GET:search": self._search,
-            "POST:newfolder": self._newfolder,
-            "POST:newfile": self._newfile,
-            "POST:rename": self._rename,
-            "POST:move": self._move,
-            "POST:delete": self._delete,
-            "POST:upload": self._upload,
-            "POST:archive": self._archive,
-            "POST:unarchive": self._unarchive,
-            "POST:save": self._save,
+            key: getattr(self, name) for key, name in self.ENDPOINTS.items()
         }
         self._default: Adapter | None = None
-        self._adapters: dict[str, FS] = OrderedDict()
+        self._adapters: dict[str, FS] = {}
+        # Adapter keys as served in every listing; rebuilt under _lock
+        # whenever the adapters change instead of on every request
+        self._storages: tuple[str, ...] = ()
+        self._lock = threading.Lock()
         self.enable_cors = enable_cors
         self.cors_origin = "http://localhost:5173"
         self.enabled = False  # Start disabled by default
 
+    @property
+    def cors_origin(self) -> str:
+        return self._cors_origin
+
+    @cors_origin.setter
+    def cors_origin(self, origin: str):
+        # Build the header list once per origin rather than once per request
+        self._cors_origin = origin
+        self._cors_headers = [("Access-Control-Allow-Origin", origin)] + self._CORS_HEADERS
+
     def enable(self):
         """Enable access to file operations"""
         self.enabled = True
@@ -98,51 +331,67 @@ class VuefinderApp(object):
         self.enabled = False
 
     def add_fs(self, key: str, fs: FS):
-        self._adapters[key] = fs
-        if len(self._adapters) == 1:
-            self._default = Adapter(key, fs)
+        with self._lock:
+            self._adapters[key] = fs
+            if len(self._adapters) == 1:
+                self._default = Adapter(key, fs)
+            self._storages = tuple(self._adapters)
 
     def remove_fs(self, key: str):
-        self._adapters.pop(key, None)
+        with self._lock:
+            self._adapters.pop(key, None)
+            self._storages = tuple(self._adapters)
 
     def clear(self):
-        self._adapters = OrderedDict()
+        with self._lock:
+            # Clear in place so references to the adapter dict stay valid
+            self._adapters.clear()
+            self._storages = ()
 
     def _get_adapter(self, request: Request) -> Adapter:
         key = request.args.get("adapter")
         return Adapter(key, self._adapters.get(key, self._default.fs))
 
-    def _get_storages(self):
-        return list(self._adapters.keys())
+    def _get_storages(self) -> tuple[str, ...]:
+        return self._storages
 
-    def _get_full_path(self, request: Request) -> str:
-        return request.args.get("path", self._get_adapter(request).key + "://")
+    def _get_full_path(self, request: Request, adapter: Adapter | None = None) -> str:
+        path = request.args.get("path")
+        if path is None:
+            # Only resolve the adapter for the default path when it is needed
+            path = (adapter or self._get_adapter(request)).key + "://"
+        return path
 
     def _fs_path(self, path: str) -> str:
         if ":/" in path:
             return fspath.abspath(path.split(":/")[1])
         return fspath.abspath(path)
 
-    def delegate(self, request: Request) -> tuple[FS, str]:
+    def _resolve(self, request: Request) -> tuple[Adapter, str]:
+        """Resolve the adapter and the full path of a request, once each."""
         adapter = self._get_adapter(request)
-        path = self._get_full_path(request)
-        return adapter.fs, self._fs_path(path)
+        return adapter, self._get_full_path(request, adapter)
+
+    def delegate(self, request: Request) -> tuple[FS, str]:
+        adapter, full_path = self._resolve(request)
+        return adapter.fs, self._fs_path(full_path)
 
     def _index(self, request: Request, filter: str | None = None) -> Response:
-        adapter = self._get_adapter(request)
-        fs, path = self.delegate(request)
+        adapter, full_path = self._resolve(request)
+        fs, path = adapter.fs, self._fs_path(full_path)
         infos = list(fs.scandir(path, namespaces=["basic", "details"]))
 
         if filter:
             infos = [info for info in infos if filter in info.name]
 
-        infos.sort(key=lambda i: ("0_" if i.is_dir else "1_") + i.name.lower())
+        # Directories first, then case-insensitive by name; tuples compare in C
+        infos.sort(key=lambda i: (not i.is_dir, i.name.casefold()))
 
         return json_response(
             {
                 "adapter": adapter.key,
                 "storages": self._get_storages(),
-                "dirname": self._get_full_path(request),
+                "dirname": full_path,
                 "files": [
                     to_vuefinder_resource(adapter.key, path, info) for info in infos
                 ],
@@ -160,8 +409,10 @@ class VuefinderApp(object):
             headers["Content-Length"] = info.size
 
         # CREDIT: https://stackoverflow.com/a/56184787/3140799
+        # wrap_file() streams the file in CHUNK_SIZE pieces instead of
+        # reading it whole, or uses the server's wsgi.file_wrapper if any
         return Response(
-            fs.open(path, "rb"),
+            wrap_file(request.environ, fs.openbin(path), CHUNK_SIZE),
             direct_passthrough=True,
             mimetype="application/octet-stream",
             headers=headers,
@@ -178,16 +429,15 @@ class VuefinderApp(object):
             headers["Content-Length"] = info.size
 
         return Response(
-            fs.open(path, "rb"),
+            wrap_file(request.environ, fs.openbin(path), CHUNK_SIZE),
             direct_passthrough=True,
-            mimetype=mimetypes.guess_type(
-                info.name)[0] or "application/octet-stream",
+            mimetype=guess_mime_type(info.name) or "application/octet-stream",
             headers=headers,
         )
 
     def _subfolders(self, request: Request) -> Response:
-        adapter = self._get_adapter(request)
-        fs, path = self.delegate(request)
+        adapter, full_path = self._resolve(request)
+        fs, path = adapter.fs, self._fs_path(full_path)
         infos = fs.scandir(path, namespaces=["basic", "details"])
         return json_response(
             {
@@ -203,80 +453,136 @@ class VuefinderApp(object):
         filter = request.args.get("filter", None)
         return self._index(request, filter)
 
+    def _changed(self, request: Request, paths: Iterable[str] = ()) -> Response:
+        """Respond to a mutation.
+
+        By default this is the refreshed directory listing. With ?full=0 the
+        directory is not scanned again and only the created or moved entries
+        at `paths` are returned.
+        """
+        if request.args.get("full") != "0":
+            return self._index(request)
+
+        adapter, full_path = self._resolve(request)
+        fs = adapter.fs
+        return json_response(
+            {
+                "adapter": adapter.key,
+                "dirname": full_path,
+                "files": [
+                    to_vuefinder_resource(
+                        adapter.key, fspath.dirname(path),
+                        fs.getinfo(path, ["basic", "details"]))
+                    for path in paths
+                ],
+            }
+        )
+
     def _newfolder(self, request: Request) -> Response:
         fs, path = self.delegate(request)
         name = request.get_json().get("name", "")
-        fs.makedir(fspath.join(path, name))
-        return self._index(request)
+        new_path = fspath.join(path, name)
+        fs.makedir(new_path)
+        return self._changed(request, [new_path])
 
     def _newfile(self, request: Request) -> Response:
         fs, path = self.delegate(request)
         name = request.get_json().get("name", "")
-        fs.writetext(fspath.join(path, name), "")
-        return self._index(request)
+        new_path = fspath.join(path, name)
+        fs.writetext(new_path, "")
+        return self._changed(request, [new_path])
 
     def _rename(self, request: Request) -> Response:
         fs, path = self.delegate(request)
         payload = request.get_json()
-        self.__move(
+        new_path = self.__move(
             fs, payload.get("item", ""), fspath.join(
                 path, payload.get("name", ""))
         )
-        return self._index(request)
+        return self._changed(request, [new_path])
 
-    def __move(self, fs, src, dst):
+    def __move(self, fs, src, dst) -> str:
         src = self._fs_path(src)
         dst = self._fs_path(dst)
         if fs.isdir(src):
             fs.movedir(src, dst, create=True)
         else:
             fs.move(src, dst)
+        return dst
 
     def _move(self, request: Request) -> Response:
         fs, _ = self.delegate(request)
         payload = request.get_json()
         dst_dir = payload.get("item", "")
+        new_paths = []
         for item in payload.get("items", []):
             src = item["path"]
-            self.__move(fs, src, fspath.combine(dst_dir, fspath.basename(src)))
-        return self._index(request)
+            new_paths.append(
+                self.__move(fs, src, fspath.combine(dst_dir, fspath.basename(src))))
+        return self._changed(request, new_paths)
 
     def _delete(self, request: Request) -> Response:
         fs, path = self.delegate(request)
         payload = request.get_json()
         for item in payload.get("items", []):
             path = self._fs_path(item["path"])
-            if fs.isdir(path):
-                fs.removetree(path)
-            else:
+            # Try a file first; a directory raises FileExpected, so no
+            # separate isdir() probe is needed
+            try:
                 fs.remove(path)
+            except errors.FileExpected:
+                fs.removetree(path)
 
-        return self._index(request)
+        return self._changed(request)
 
     def _upload(self, request: Request) -> Response:
         fs, path = self.delegate(request)
-        for fsrc in request.files.values():
-            with fs.open(fspath.join(path, request.form.get("name", "")), "wb") as fdst:
-                copyfileobj(fsrc.stream, fdst)
+        files = [fsrc for _, fsrc in request.files.items(multi=True)]
+        # The frontend posts one file per request, with its (possibly
+        # relative) path in the "name" field. Otherwise each file keeps
+        # the name it was sent with.
+        name = request.form.get("name") if len(files) == 1 else None
+        if name:
+            uploads = [(name, files[0])]
+        else:
+            uploads = [(fspath.basename(fsrc.filename or ""), fsrc) for fsrc in files]
+            # Check every name before writing anything
+            if not all(is_valid_name(dst) for dst, _ in uploads):
+                raise BadRequest("Invalid file name")
+        for dst, fsrc in uploads:
+            with fs.openbin(fspath.join(path, dst), "w") as fdst:
+                copy_stream(fsrc.stream, fdst)
 
         return json_response("ok")
 
     def _write_zip(self, zip: FS, fs: FS, paths: list[str], base="/"):
         # ZipFS Docs: https://docs.pyfilesystem.org/en/latest/reference/zipfs.html#fs.zipfs.ZipFS
-        while len(paths) > 0:
-            path = paths.pop()
-            dst_path = fspath.relativefrom(base, path)
-            if fs.isdir(path):
-                zip.makedir(dst_path)
-                paths = [fspath.join(path, name)
-                         for name in fs.listdir(path)] + paths
+        # Pending (path, dst_path, is_dir) entries. A deque makes queueing a
+        # directory's children O(children), and scandir() tells files from
+        # directories without an isdir() call per entry. Only the selected
+        # paths are relativized; descendants extend their parent's paths.
+        entries = deque(
+            (path, fspath.relativefrom(base, path), fs.isdir(path)) for path in paths)
+        pop, extendleft = entries.pop, entries.extendleft
+        scandir, openbin = fs.scandir, fs.openbin
+        makedir, writefile = zip.makedir, zip.writefile
+        while entries:
+            path, dst_path, is_dir = pop()
+            if is_dir:
+                makedir(dst_path)
+                # Paths are normalized, so plain concatenation joins them
+                prefix = path.rstrip("/") + "/"
+                dst_prefix = dst_path + "/" if dst_path else ""
+                extendleft(
+                    (prefix + info.name, dst_prefix + info.name, info.is_dir)
+                    for info in scandir(path))
             else:
-                with fs.openbin(path) as f:
-                    zip.writefile(dst_path, f)
+                with openbin(path) as f:
+                    writefile(dst_path, f)
 
     def _get_filename(self, payload: dict, param: str = "name", ext: str = "") -> str:
         name = payload.get("name", None)
-        if name is None or not is_valid_filename(name, platform="universal"):
+        if name is None or not is_valid_name(name):
             raise BadRequest("Invalid archive name")
 
         if ext.startswith(".") and fspath.splitext(name)[1] != ext:
@@ -310,18 +616,28 @@ class VuefinderApp(object):
         paths: list[str] = json.loads(request.args.get("paths", "[]"))
         paths = [self._fs_path(path) for path in paths]
 
-        stream = io.BytesIO()
+        # Small archives stay in memory, larger ones spill to a temporary
+        # file; either way the response streams it instead of copying it
+        stream = SpooledTemporaryFile(max_size=ARCHIVE_SPOOL_SIZE)
 
-        with ZipFS(stream, write=True) as zip:
-            self._write_zip(zip, fs, paths, path)
+        try:
+            with ZipFS(stream, write=True) as zip:
+                self._write_zip(zip, fs, paths, path)
+            size = stream.tell()
+            stream.seek(0)
+        except BaseException:
+            # Remove the temporary file now rather than when it is collected
+            stream.close()
+            raise
 
         return Response(
-            stream.getvalue(),
+            wrap_file(request.environ, stream, CHUNK_SIZE),
             direct_passthrough=True,
             mimetype="application/octet-stream",
             headers={
                 "Content-Disposition": f'attachment; filename="{name}"',
                 "Content-Type": "application/zip",
+                "Content-Length": size,
             },
         )
 
@@ -331,14 +647,26 @@ class VuefinderApp(object):
 
         with fs.openbin(archive_path) as zip_file:
             with ZipFS(zip_file) as zip:
-                # check if any file already exists
-                walker = walk.Walker()
-                for file_path in walker.files(zip):
-                    dst_path = fspath.join(path, fspath.relpath(file_path))
-                    if fs.exists(dst_path):
-                        raise BadRequest(
-                            f"File {dst_path} would be overridden by unarchive"
-                        )
+                # check if any file already exists, listing each destination
+                # directory once instead of probing every file
+                names_by_dir: dict[str, list[str]] = {}
+                for file_path in walk.Walker().files(zip):
+                    dirname, name = fspath.split(fspath.relpath(file_path))
+                    names_by_dir.setdefault(dirname, []).append(name)
+
+                # On a case-insensitive file system "A.txt" overwrites "a.txt"
+                key = str.casefold if fs.getmeta().get("case_insensitive") else str
+                for dirname, names in names_by_dir.items():
+                    dst_dir = fspath.join(path, dirname)
+                    try:
+                        existing = {key(name) for name in fs.listdir(dst_dir)}
+                    except (errors.ResourceNotFound, errors.DirectoryExpected):
+                        continue
+                    for name in names:
+                        if key(name) in existing:
+                            raise BadRequest(
+                                f"File {fspath.join(dst_dir, name)} would be overridden by unarchive"
+                            )
 
                 copy.copy_dir(zip, "/", fs, path)
 
@@ -368,7 +696,7 @@ class VuefinderApp(object):
             return {"message": "Content saved successfully", "path": path}
         except Exception as e:
             # Log and return error response
-            logger.error(f"Error saving content: {e}")
+            logger.error("Error saving content: %s", e)
             return {"error": f"Failed to save content: {str(e)}"}
 
     def create_new_file(self, fs_name: str, path: str, name: str) -> dict:
@@ -389,7 +717,7 @@ class VuefinderApp(object):
             return {"message": "File created successfully", "path": full_path}
         except Exception as e:
             # Log and return error response
-            logger.error(f"Error creating file: {e}")
+            logger.error("Error creating file: %s", e)
             return {"error": f"Failed to create file: {str(e)}"}
 
     def create_new_folder(self, fs_name: str, path: str, name: str) -> dict:
@@ -410,7 +738,7 @@ class VuefinderApp(object):
             return {"message": "Folder created successfully", "path": full_path}
         except Exception as e:
             # Log and return error response
-            logger.error(f"Error creating folder: {e}")
+            logger.error("Error creating folder: %s", e)
             return {"error": f"Failed to create folder: {str(e)}"}
 
     def delete_item(self, fs_name: str, path: str) -> dict:
@@ -421,17 +749,18 @@ class VuefinderApp(object):
             if not fs:
                 raise ValueError(f"File system '{fs_name}' not found")
 
-            # Check if the path is a directory or file and delete accordingly
-            if fs.isdir(path):
-                fs.removetree(path)
-            else:
+            # Try a file first; a directory raises FileExpected, so no
+            # separate isdir() probe is needed
+            try:
                 fs.remove(path)
+            except errors.FileExpected:
+                fs.removetree(path)
 
             # Return success response
             return {"message": "Deleted successfully", "path": path}
         except Exception as e:
             # Log and return error response
-            logger.error(f"Error deleting item: {e}")
+            logger.error("Error deleting item: %s", e)
             return {"error": f"Failed to delete item: {str(e)}"}
 
     def download_file(self, fs_name: str, path: str) -> dict:
@@ -442,12 +771,12 @@ class VuefinderApp(object):
             if not fs:
                 raise ValueError(f"File system '{fs_name}' not found")
 
-            if not fs.exists(path):
+            # Get file info; this also tells whether the path exists
+            try:
+                info = fs.getinfo(path, ["basic", "details"])
+            except errors.ResourceNotFound:
                 raise ValueError(f"Path '{path}' does not exist")
 
-            # Get file info
-            info = fs.getinfo(path, ["basic", "details"])
-
             # Read file content
             with fs.open(path, 'rb') as f:
                 content = f.read()
@@ -457,14 +786,42 @@ class VuefinderApp(object):
                 "name": info.name,
                 "size": info.size,
                 "content": content,
-                "mime_type": mimetypes.guess_type(info.name)[0] or "application/octet-stream"
+                "mime_type": guess_mime_type(info.name) or "application/octet-stream"
             }
         except Exception as e:
-            logger.error(f"Error downloading file: {e}")
+            logger.error("Error downloading file: %s", e)
             return {"error": f"Failed to download file: {str(e)}"}
 
+    def open_file(self, fs_name: str, path: str) -> dict:
+        """Open a file for streaming programmatically."""
+        try:
+            # Get the file system adapter
+            fs = self._adapters.get(fs_name)
+            if not fs:
+                raise ValueError(f"File system '{fs_name}' not found")
+
+            # Get file info
+            info = fs.getinfo(path, ["basic", "details"])
+
+            # Return file details and an open binary stream; the caller closes it
+            return {
+                "name": info.name,
+                "size": info.size,
+                "stream": fs.openbin(path),
+                "mime_type": guess_mime_type(info.name) or "application/octet-stream"
+            }
+        except Exception as e:
+            logger.error("Error opening file: %s", e)
+            return {"error": f"Failed to open file: {str(e)}"}
+
     def upload_file(self, fs_name: str, path: str, file_name: str, content: bytes) -> dict:
         """Upload a file programmatically."""
+        return self.upload_file_stream(fs_name, path, file_name, io.BytesIO(content))
+
+    def upload_file_stream(
+        self, fs_name: str, path: str, file_name: str, stream: BinaryIO, chunk_size: int = CHUNK_SIZE
+    ) -> dict:
+        """Upload a file from a binary stream programmatically."""
         try:
             # Get the file system adapter
             fs = self._adapters.get(fs_name)
@@ -475,15 +832,15 @@ class VuefinderApp(object):
             clean_filename = fspath.basename(file_name)
 
             # Sanitize the filename
-            if not is_valid_filename(clean_filename, platform="universal"):
+            if not is_valid_name(clean_filename):
                 raise ValueError(f"Invalid filename: {clean_filename}")
 
             # Construct full path
             full_path = fspath.join(path, clean_filename)
 
-            # Write file content
-            with fs.open(full_path, 'wb') as f:
-                f.write(content)
+            # Copy the stream in chunks so the whole file is never held in memory
+            with fs.openbin(full_path, "w") as f:
+                copy_stream(stream, f, chunk_size)
 
             # Return success response
             return {
@@ -492,42 +849,37 @@ class VuefinderApp(object):
                 "name": clean_filename
             }
         except Exception as e:
-            logger.error(f"Error uploading file: {e}")
+            logger.error("Error uploading file: %s", e)
             return {"error": f"Failed to upload file: {str(e)}"}
 
     def dispatch_request(self, request: Request):
-        headers = {}
-        if self.enable_cors:
-            # Allow credentials and specify exact origin
-            headers.update({
-                'Access-Control-Allow-Origin': self.cors_origin,
-                'Access-Control-Allow-Methods': 'GET, POST, PUT, DELETE, OPTIONS, PATCH',
-                'Access-Control-Allow-Headers': 'Content-Type, Authorization, x-api-key',
-                'Access-Control-Allow-Credentials': 'true',
-                'Access-Control-Expose-Headers': 'Content-Type, Authorization'
-            })
-            
-            # Handle preflight OPTIONS request
-            if request.method == 'OPTIONS':
-                return Response('', 204, headers)
-
-        # Check if app is enabled
-        if not self.enabled:
-            response = json_response({"error": "Unauthorized"}, status=401)
+        headers = self._cors_headers if self.enable_cors else ()
+        # Handle preflight OPTIONS request
+        if headers and request.method == 'OPTIONS':
+            return Response('', 204, headers)
+
+        # Check if app is enabled, globally or for this request only
+        if not (self.enabled or request.environ.get(self.ENABLED_ENVIRON_KEY)):
+            response = json_bytes_response(_UNAUTHORIZED, status=401)
             response.headers.extend(headers)
             return response
 
         # Extract endpoint from query parameter
-        endpoint = request.method + ":" + request.args.get("q", "")
-        if endpoint not in self.endpoints:
+        handler = self.endpoints.get((request.method, request.args.get("q", "")))
+        if handler is None:
             raise BadRequest()
 
         response = None
         try:
-            response = self.endpoints[endpoint](request)
+            response = handler(request)
         except errors.ResourceReadOnly as exc:
             response = json_response(
                 {"message": str(exc), "status": False}, 400)
+        except errors.CreateFailed as exc:
+            # A lazily opened file system (LazyFS) failed on first use
+            logger.error("File system unavailable: %s", exc)
+            response = json_response(
+                {"message": "File system is unavailable", "status": False}, 503)
         except BadRequest as exc:
             response = json_response(
                 {"message": exc.description, "status": False}, 400)